@@ -92,6 +92,9 @@ class NetworkDiscovery(QObject):
         self.socket_timeout = 0.5      # 套接字接收超时
         self.device_timeout = 60.0     # 设备超时时间(秒)，从30秒增加到60秒，减少网络波动影响
         
+        # 停止事件，每次启动时重新创建，各线程通过它等待和检测停止
+        self._stop_event = threading.Event()
+        
         # 线程
         self.discovery_thread = None
         self.broadcast_thread = None
@@ -103,18 +106,19 @@ class NetworkDiscovery(QObject):
             return
         
         self.is_running = True
+        self._stop_event = threading.Event()
         self.statusChanged.emit("正在启动设备发现服务...")
         
         # 启动发现线程
-        self.discovery_thread = threading.Thread(target=self._discovery_loop, daemon=True)
+        self.discovery_thread = threading.Thread(target=self._discovery_loop, args=(self._stop_event,), daemon=True)
         self.discovery_thread.start()
         
         # 启动广播线程
-        self.broadcast_thread = threading.Thread(target=self._broadcast_loop, daemon=True)
+        self.broadcast_thread = threading.Thread(target=self._broadcast_loop, args=(self._stop_event,), daemon=True)
         self.broadcast_thread.start()
         
         # 启动清理线程
-        self.cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
+        self.cleanup_thread = threading.Thread(target=self._cleanup_loop, args=(self._stop_event,), daemon=True)
         self.cleanup_thread.start()
         
         self.statusChanged.emit("设备发现服务已启动")
@@ -125,8 +129,9 @@ class NetworkDiscovery(QObject):
         if not self.is_running:
             return
         
-        # 先设置状态为未运行
+        # 先设置状态为未运行，并立即唤醒正在等待的线程
         self.is_running = False
+        self._stop_event.set()
         self.statusChanged.emit("正在停止设备发现服务...")
         
         # 在单独的线程中发送离线广播
@@ -175,7 +180,7 @@ class NetworkDiscovery(QObject):
             except:
                 pass
     
-    def _discovery_loop(self):
+    def _discovery_loop(self, stop_event):
         """设备发现循环"""
         try:
             # 创建UDP套接字
@@ -186,7 +191,7 @@ class NetworkDiscovery(QObject):
             
             logger.info(f"监听设备广播在端口 {self.discovery_port}")
             
-            while self.is_running:
+            while not stop_event.is_set():
                 try:
                     data, addr = sock.recvfrom(1024)
                     self._handle_discovery_message(data, addr)
@@ -194,7 +199,7 @@ class NetworkDiscovery(QObject):
                     continue
                 except Exception as e:
                     logger.error(f"接收设备广播时出错: {str(e)}")
-                    time.sleep(1)  # 发生错误时暂停一下
+                    stop_event.wait(1)  # 发生错误时暂停一下
         
         except Exception as e:
             logger.error(f"设备发现线程错误: {str(e)}")
@@ -205,7 +210,7 @@ class NetworkDiscovery(QObject):
                 pass
             logger.info("设备发现线程已结束")
     
-    def _broadcast_loop(self):
+    def _broadcast_loop(self, stop_event):
         """设备广播循环"""
         try:
             # 创建UDP广播套接字
@@ -215,7 +220,7 @@ class NetworkDiscovery(QObject):
             
             logger.info(f"开始广播设备信息，间隔 {self.broadcast_interval} 秒")
             
-            while self.is_running:
+            while not stop_event.is_set():
                 try:
                     # 获取所有网络接口的广播地址
                     broadcast_addresses = self._get_broadcast_addresses()
@@ -224,12 +229,12 @@ class NetworkDiscovery(QObject):
                     for broadcast_address in broadcast_addresses:
                         self._send_broadcast(sock, broadcast_address)
                     
-                    # 等待下一个广播周期
-                    time.sleep(self.broadcast_interval)
+                    # 等待下一个广播周期（停止时立即返回）
+                    stop_event.wait(self.broadcast_interval)
                 
                 except Exception as e:
                     logger.error(f"广播设备信息时出错: {str(e)}")
-                    time.sleep(1)
+                    stop_event.wait(1)
         
         except Exception as e:
             logger.error(f"设备广播线程错误: {str(e)}")
@@ -240,31 +245,32 @@ class NetworkDiscovery(QObject):
                 pass
             logger.info("设备广播线程已结束")
     
-    def _cleanup_loop(self):
+    def _cleanup_loop(self, stop_event):
         """清理过期设备循环"""
         try:
             logger.info("启动设备超时清理线程")
             
-            while self.is_running:
+            while not stop_event.is_set():
                 try:
                     # 检查过期设备
                     expired_devices = []
                     for device_id, device in list(self.devices.items()):
                         if device.is_expired(timeout=self.device_timeout) and device_id != self.device_id:
-                            expired_devices.append(device)
-                            del self.devices[device_id]
+                            # 设备可能已被发现线程因离线通知移除，使用pop避免KeyError
+                            if self.devices.pop(device_id, None) is not None:
+                                expired_devices.append(device)
                     
                     # 触发设备离线信号
                     for device in expired_devices:
                         logger.info(f"设备已超时: {device.name} ({device.device_id}) - {device.ip}")
                         self.deviceLost.emit(device)
                     
-                    # 休眠
-                    time.sleep(5)
+                    # 等待下一次检查（停止时立即返回）
+                    stop_event.wait(5)
                 
                 except Exception as e:
                     logger.error(f"清理过期设备时出错: {str(e)}")
-                    time.sleep(1)
+                    stop_event.wait(1)
         
         except Exception as e:
             logger.error(f"设备清理线程错误: {str(e)}")
@@ -293,8 +299,8 @@ class NetworkDiscovery(QObject):
             
             # 如果是离线广播，则从设备列表中移除该设备并发出设备离线信号
             if is_offline:
-                if device_id in self.devices:
-                    removed_device = self.devices.pop(device_id)
+                removed_device = self.devices.pop(device_id, None)
+                if removed_device is not None:
                     logger.info(f"收到设备离线通知: {device_name} ({device_id}) - {device_ip}")
                     self.deviceLost.emit(removed_device)
                 return
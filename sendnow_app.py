@@ -413,7 +413,7 @@ class SendNowApp(MainWindow):
         """处理服务器传输进度事件"""
         # 计算百分比
         percent = (current * 100) // total if total > 0 else 0
-        logger.debug(f"接收进度: {filename} - {current}/{total} 字节 ({percent}%)")
+        logger.debug("接收进度: %s - %d/%d 字节 (%d%%)", filename, current, total, percent)
         
         # 更新接收面板进度条
         self.receivePanel.statusPanel.progressBar.setValue(percent)
@@ -478,7 +478,7 @@ class SendNowApp(MainWindow):
         """处理客户端传输进度事件"""
         # 计算百分比
         percent = (current * 100) // total if total > 0 else 0
-        logger.debug(f"发送进度: {filename} - {current}/{total} 字节 ({percent}%)")
+        logger.debug("发送进度: %s - %d/%d 字节 (%d%%)", filename, current, total, percent)
         
         # 显示发送进度条
         if not self.sendPanel.statusPanel.isVisible():
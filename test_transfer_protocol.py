@@ -0,0 +1,214 @@
+"""
+以下代码及注释全部由AI Agent生成
+"""
+
+"""
+SendNow传输协议测试模块 (Transfer Protocol Test Module)
+
+该模块使用本地套接字对（socketpair）测试文件传输协议，不需要网络和事件循环。
+主要功能：
+- 测试控制消息的编码与接收（长度前缀 + JSON）
+- 测试超大控制消息被拒绝
+- 测试服务器端完整接收空文件和多个数据块的文件
+- 测试哈希校验失败时清理不完整的文件
+- 测试已存在的同名文件和.part文件不会被覆盖
+- 测试对端发送的异常文件名和算法列表
+
+可以直接运行，也可以通过 python -m unittest 或 pytest 运行。
+"""
+
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from transfer.common import CHUNK_SIZE, MAX_MESSAGE_SIZE
+from transfer.server import FileTransferServer
+from transfer.utils import new_hasher, send_message, recv_message
+
+class MessageFramingTest(unittest.TestCase):
+    """控制消息收发测试"""
+
+    def setUp(self):
+        self.sender, self.receiver = socket.socketpair()
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def test_round_trip(self):
+        """连续发送的多条消息按顺序原样接收"""
+        messages = [
+            {"name": "报告.pdf", "size": 123, "hash_algorithms": ["sha256"]},
+            {"status": "accepted", "hash_algorithm": "sha256"},
+            {},
+        ]
+        for message in messages:
+            send_message(self.sender, message)
+
+        for message in messages:
+            self.assertEqual(recv_message(self.receiver), message)
+
+    def test_connection_closed(self):
+        """对端关闭连接时返回None"""
+        self.sender.close()
+        self.assertIsNone(recv_message(self.receiver))
+
+    def test_oversized_message_rejected(self):
+        """声明长度超过上限的消息直接拒绝，不分配缓冲区"""
+        self.sender.sendall(struct.pack('!I', MAX_MESSAGE_SIZE + 1))
+        with self.assertRaises(ValueError):
+            recv_message(self.receiver)
+
+class ReceiveFileTest(unittest.TestCase):
+    """服务器端接收文件测试（直接调用_handle_client，客户端一侧按协议手动收发）"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.save_dir = self.temp_dir.name
+
+        # 不在运行测试的机器上创建默认保存目录（各测试直接指定临时目录）
+        with mock.patch('transfer.server.ensure_directory_exists'):
+            self.server = FileTransferServer()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _start_receiver(self, file_info):
+        """在新线程中运行服务器端的接收流程，返回(接收线程, 客户端一侧的套接字)"""
+        server_socket, client_socket = socket.socketpair()
+        client_socket.settimeout(10)  # 服务器端出错时测试失败，而不是一直等待
+        worker = threading.Thread(
+            target=self.server._handle_client,
+            args=(server_socket, ("127.0.0.1", 0), file_info, self.save_dir)
+        )
+        worker.start()
+        return worker, client_socket
+
+    def _finish(self, worker, client_socket):
+        """关闭客户端一侧的套接字并等待接收线程结束"""
+        client_socket.close()
+        worker.join(10)
+        self.assertFalse(worker.is_alive(), "接收线程没有结束")
+
+    def _transfer(self, name, data, file_hash=None):
+        """通过套接字对发送文件，返回服务器的最终响应"""
+        file_info = {"name": name, "size": len(data), "hash_algorithms": ["sha256"], "sender": "127.0.0.1"}
+        worker, client_socket = self._start_receiver(file_info)
+
+        try:
+            response = recv_message(client_socket)
+            self.assertEqual(response, {"status": "accepted", "hash_algorithm": "sha256"})
+
+            client_socket.sendall(data)
+            if file_hash is None:
+                hash_obj = new_hasher("sha256")
+                hash_obj.update(data)
+                file_hash = hash_obj.hexdigest()
+            send_message(client_socket, {"hash": file_hash})
+
+            return recv_message(client_socket)
+        finally:
+            self._finish(worker, client_socket)
+
+    def _read(self, name):
+        with open(os.path.join(self.save_dir, name), 'rb') as f:
+            return f.read()
+
+    def test_empty_file(self):
+        """空文件"""
+        response = self._transfer("empty.txt", b"")
+
+        self.assertEqual(response["status"], "success")
+        self.assertEqual(os.listdir(self.save_dir), ["empty.txt"])
+        self.assertEqual(self._read("empty.txt"), b"")
+
+    def test_multi_chunk_file(self):
+        """大小不是数据块整数倍的多块文件"""
+        data = os.urandom(2 * CHUNK_SIZE + 12345)
+        response = self._transfer("data.bin", data)
+
+        self.assertEqual(response["status"], "success")
+        self.assertEqual(os.listdir(self.save_dir), ["data.bin"])
+        self.assertEqual(self._read("data.bin"), data)
+
+    def test_hash_mismatch_cleans_up(self):
+        """哈希校验失败时报告错误，并删除临时文件和占位文件"""
+        response = self._transfer("broken.bin", os.urandom(CHUNK_SIZE + 1), file_hash="0" * 64)
+
+        self.assertEqual(response["status"], "error")
+        self.assertEqual(os.listdir(self.save_dir), [])
+
+    def test_existing_file_not_overwritten(self):
+        """同名文件已存在时保存为带数字后缀的文件，原有文件保持不变"""
+        with open(os.path.join(self.save_dir, "data.bin"), 'wb') as f:
+            f.write(b"user data")
+
+        data = os.urandom(1000)
+        response = self._transfer("data.bin", data)
+
+        self.assertEqual(response["status"], "success")
+        self.assertEqual(sorted(os.listdir(self.save_dir)), ["data.bin", "data_1.bin"])
+        self.assertEqual(self._read("data.bin"), b"user data")
+        self.assertEqual(self._read("data_1.bin"), data)
+
+    def test_existing_part_file_not_overwritten(self):
+        """同名的.part文件已存在时临时文件改用带数字后缀的文件名，不覆盖该文件"""
+        with open(os.path.join(self.save_dir, "data.bin.part"), 'wb') as f:
+            f.write(b"user data")
+
+        data = os.urandom(1000)
+        response = self._transfer("data.bin", data)
+
+        self.assertEqual(response["status"], "success")
+        self.assertEqual(sorted(os.listdir(self.save_dir)), ["data.bin", "data.bin.part"])
+        self.assertEqual(self._read("data.bin.part"), b"user data")
+        self.assertEqual(self._read("data.bin"), data)
+
+    def test_incomplete_file_uses_part_name(self):
+        """接收过程中只存在.part文件，连接中断后将其删除"""
+        file_info = {"name": "data.bin", "size": 2000, "hash_algorithms": ["sha256"], "sender": "127.0.0.1"}
+        worker, client_socket = self._start_receiver(file_info)
+
+        try:
+            self.assertEqual(recv_message(client_socket)["status"], "accepted")
+            client_socket.sendall(os.urandom(1000))
+
+            # 接受响应在创建临时文件之前发送，等待临时文件出现
+            deadline = time.monotonic() + 10
+            while not os.listdir(self.save_dir) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(os.listdir(self.save_dir), ["data.bin.part"])
+        finally:
+            self._finish(worker, client_socket)
+
+        self.assertEqual(os.listdir(self.save_dir), [])
+
+    def test_name_with_directory_part(self):
+        """对端发送的文件名包含目录时只使用文件名部分，保存到保存目录中"""
+        data = os.urandom(1000)
+        response = self._transfer("sub/data.bin", data)
+
+        self.assertEqual(response["status"], "success")
+        self.assertEqual(os.listdir(self.save_dir), ["data.bin"])
+        self.assertEqual(self._read("data.bin"), data)
+
+    def test_malformed_hash_algorithms(self):
+        """对端发送格式异常的算法列表时报告错误并关闭连接"""
+        file_info = {"name": "data.bin", "size": 1000, "hash_algorithms": 5, "sender": "127.0.0.1"}
+        worker, client_socket = self._start_receiver(file_info)
+
+        try:
+            self.assertEqual(recv_message(client_socket)["status"], "error")
+            self.assertIsNone(recv_message(client_socket))  # 连接已关闭
+        finally:
+            self._finish(worker, client_socket)
+
+        self.assertEqual(os.listdir(self.save_dir), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,20 +12,17 @@
 - 监控传输进度并发出信号
 - 处理传输结果和错误情况
 
-作为应用程序传输模块的一部分，提供可靠的文件发送能力，支持MD5哈希校验确保文件完整性。
+作为应用程序传输模块的一部分，提供可靠的文件发送能力，支持SHA-256（可选BLAKE3）哈希校验确保文件完整性。
 """
 
 import os
 import socket
-import json
 import threading
 import time
-import hashlib
-import logging
 from PyQt5.QtCore import QObject, pyqtSignal
 
-from .common import BUFFER_SIZE, SERVICE_PORT, logger
-from .utils import compute_file_hash
+from .common import CHUNK_SIZE, SERVICE_PORT, PROGRESS_INTERVAL, logger
+from .utils import new_hasher, configure_socket, send_message, recv_message, SUPPORTED_HASH_ALGORITHMS
 
 class FileTransferClient(QObject):
     """文件传输客户端，用于向服务器发送文件"""
@@ -52,14 +49,11 @@ class FileTransferClient(QObject):
         filename = os.path.basename(file_path)
         file_size = os.path.getsize(file_path)
         
-        # 计算文件MD5哈希值
-        file_hash = compute_file_hash(file_path)
-        
-        # 创建文件信息
+        # 创建文件信息（哈希值在发送过程中计算，发送完数据后再传给服务器）
         file_info = {
             "name": filename,
             "size": file_size,
-            "hash": file_hash,
+            "hash_algorithms": list(SUPPORTED_HASH_ALGORITHMS),  # 本机支持的算法，由服务器从中选择
             "type": os.path.splitext(filename)[1][1:],  # 文件类型（扩展名）
             "timestamp": int(time.time())
         }
@@ -84,19 +78,20 @@ class FileTransferClient(QObject):
             self.statusChanged.emit(f"正在连接到 {server_host}:{server_port}...")
             self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.client_socket.settimeout(60)  # 设置超时时间为60秒（1分钟）
+            configure_socket(self.client_socket)  # 在连接前设置，使缓冲区大小参与TCP窗口协商
             self.client_socket.connect((server_host, server_port))
             
             # 发送文件信息
             self.statusChanged.emit("正在发送文件信息...")
-            info_json = json.dumps(file_info)
-            self.client_socket.sendall(info_json.encode('utf-8'))
+            send_message(self.client_socket, file_info)
             
-            # 等待服务器确认
-            response_data = self.client_socket.recv(4096)
-            if not response_data:
+            # 等待服务器确认。等待用户确认以及排队等待空闲接收线程的时间都不确定，
+            # 因此等待期间不设超时，收到响应后恢复60秒超时
+            self.client_socket.settimeout(None)
+            response = recv_message(self.client_socket)
+            if response is None:
                 raise Exception("服务器没有响应")
-            
-            response = json.loads(response_data.decode('utf-8'))
+            self.client_socket.settimeout(60)
             
             # 检查服务器响应
             if response.get("status") != "accepted":
@@ -106,35 +101,76 @@ class FileTransferClient(QObject):
             # 发送文件数据
             self.statusChanged.emit(f"正在发送文件: {filename}")
             
-            with open(file_path, 'rb') as f:
+            # 使用服务器选定的校验算法
+            hash_algorithm = response.get("hash_algorithm")
+            if hash_algorithm not in SUPPORTED_HASH_ALGORITHMS:
+                raise Exception(f"服务器选择了不支持的哈希算法: {hash_algorithm}")
+            
+            # 边发送边计算哈希值，避免发送前额外完整读取一遍文件
+            hash_obj = new_hasher(hash_algorithm)
+            
+            # 按CHUNK_SIZE整块读取，不需要Python的缓冲层
+            with open(file_path, 'rb', buffering=0) as f:
+                # 提示内核按顺序读取，加大预读（仅支持posix_fadvise的平台）
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                
+                # 复用同一个读取缓冲区，计算哈希后直接发送，避免每个数据块都分配新的bytes对象。
+                # 边发送边计算哈希需要数据经过用户态，因此不使用sendfile零拷贝发送（否则每个数据块要从页缓存读取两次）；
+                # 也不使用内存映射读取：文件在发送过程中被截断时readinto只会提前读到文件末尾，而内存映射会触发SIGBUS
+                buffer_view = memoryview(bytearray(CHUNK_SIZE))
+                
                 sent = 0
+                next_progress_time = 0.0
+                reported = -1  # 最近一次发出的进度，避免循环结束后重复发送相同进度
+                # 累计一定字节数（文件大小的0.5%，最多一个数据块）后才检查时间，避免每个零碎的数据块都读取时钟
+                progress_step = min(file_size // 200, CHUNK_SIZE)
+                
+                # 循环中频繁调用的方法预先绑定到局部变量，减少每次迭代的属性查找
+                sock_sendall = self.client_socket.sendall
+                read_into = f.readinto
+                update_hash = hash_obj.update
+                emit_progress = self.transferProgress.emit
+                monotonic = time.monotonic
                 
                 while sent < file_size:
-                    # 读取数据块
-                    chunk = f.read(BUFFER_SIZE)
-                    if not chunk:
+                    # 读取数据块（最多读取到声明的文件大小为止），更新哈希后发送
+                    count = read_into(buffer_view[:min(CHUNK_SIZE, file_size - sent)])
+                    if not count:
                         break
-                    
-                    # 发送数据块
-                    self.client_socket.sendall(chunk)
+                    chunk = buffer_view[:count]
+                    update_hash(chunk)
+                    sock_sendall(chunk)
                     
                     # 更新发送计数
-                    sent += len(chunk)
+                    sent += count
                     
-                    # 发送进度信号
-                    self.transferProgress.emit(filename, sent, file_size)
+                    # 发送进度信号（限制频率，避免每个数据块都触发UI更新）
+                    if sent - reported >= progress_step:
+                        now = monotonic()
+                        if now >= next_progress_time:
+                            emit_progress(filename, sent, file_size)
+                            reported = sent
+                            next_progress_time = now + PROGRESS_INTERVAL
+            
+            if sent < file_size:
+                raise Exception("文件在发送过程中被修改")
+            
+            # 发送最终进度（循环中最后一次已发送时跳过）
+            if reported != sent:
+                self.transferProgress.emit(filename, sent, file_size)
+            
+            # 发送文件哈希值供服务器校验
+            send_message(self.client_socket, {"hash": hash_obj.hexdigest()})
             
             # 等待服务器确认传输完成
-            response_data = self.client_socket.recv(4096)
-            if not response_data:
+            response = recv_message(self.client_socket)
+            if response is None:
                 raise Exception("服务器没有确认传输完成")
             
-            # 解析服务器响应
-            response = json.loads(response_data.decode('utf-8'))
-            
             # 检查传输结果
             if response.get("status") == "success":
-                logger.info(f"文件发送成功: {filename}")
+                logger.info("文件发送成功: %s", filename)
                 self.statusChanged.emit("传输已完成")
                 self.transferComplete.emit(filename, response)
             else:
@@ -143,7 +179,7 @@ class FileTransferClient(QObject):
         
         except Exception as e:
             error_msg = str(e)
-            logger.error(f"文件发送失败: {filename} - {error_msg}")
+            logger.error("文件发送失败: %s - %s", filename, error_msg)
             self.statusChanged.emit(f"传输失败: {error_msg}")
             self.transferFailed.emit(filename, error_msg)
         
@@ -19,7 +19,16 @@ import logging
 # 默认传输参数
 BUFFER_SIZE = 8192  # 8KB缓冲区
 CHUNK_SIZE = 1024 * 1024  # 1MB块大小
+SOCKET_BUFFER_SIZE = 4 * 1024 * 1024  # 4MB套接字收发缓冲区
+HASH_ALGORITHM = "sha256"  # 文件校验算法（OpenSSL实现可使用SHA-NI硬件加速，安装blake3后也可使用"blake3"）
 SERVICE_PORT = 45679  # 默认传输服务端口
+PROGRESS_INTERVAL = 1 / 30  # 进度信号最小间隔（秒），限制在每秒30次以内
+RECV_BUFFERS_PER_TRANSFER = 3  # 每个接收传输轮流使用的缓冲区数量（接收与写盘并行）
+SYNC_INTERVAL = 64 * 1024 * 1024  # 接收时每写入64MB同步一次磁盘，使传输结束时的最终同步不会超过客户端的60秒超时
+MAX_MESSAGE_SIZE = 1024 * 1024  # 控制消息最大长度（1MB），防止异常数据导致分配过大内存
+MAX_REQUEST_HANDLERS = 32  # 同时读取传输请求（文件信息）的线程数量上限
+MAX_PENDING_REQUESTS = 64  # 等待用户确认的传输请求上限，超出时关闭最早的请求
+MAX_CONCURRENT_TRANSFERS = 16  # 同时进行的接收传输上限，超出的传输排队等待
 
 # 确保日志配置
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
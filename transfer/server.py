@@ -10,7 +10,7 @@
 - 监听网络连接请求
 - 处理客户端传输请求并等待用户确认
 - 接收文件数据并保存到指定目录
-- 验证文件完整性（MD5哈希校验）
+- 验证文件完整性（SHA-256/BLAKE3哈希校验）
 - 提供传输进度和状态更新
 
 作为应用程序传输模块的核心组件，提供稳定的文件接收服务，支持多客户端并发传输。
@@ -18,15 +18,47 @@
 
 import os
 import socket
-import json
+import queue
+import selectors
 import threading
 import time
-import hashlib
-import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtCore import QObject, pyqtSignal
 
-from .common import BUFFER_SIZE, SERVICE_PORT, logger
-from .utils import ensure_directory_exists, is_directory_writable
+from .common import (CHUNK_SIZE, SERVICE_PORT, PROGRESS_INTERVAL, HASH_ALGORITHM, RECV_BUFFERS_PER_TRANSFER, SYNC_INTERVAL,
+                     MAX_REQUEST_HANDLERS, MAX_PENDING_REQUESTS, MAX_CONCURRENT_TRANSFERS, logger)
+from .utils import (ensure_directory_exists, is_directory_writable, new_hasher,
+                    configure_socket, encode_message, send_message, recv_message, write_all,
+                    SUPPORTED_HASH_ALGORITHMS)
+
+# macOS和Windows没有fdatasync，退化为fsync
+_fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+# 内容固定的响应消息，预先编码，避免每次传输重复序列化
+_ACCEPTED_RESPONSES = {
+    algorithm: encode_message({"status": "accepted", "hash_algorithm": algorithm})
+    for algorithm in SUPPORTED_HASH_ALGORITHMS
+}
+_REJECTED_RESPONSE = encode_message({"status": "rejected", "reason": "User rejected the transfer"})
+_SUCCESS_RESPONSE = encode_message({"status": "success", "message": "File received successfully"})
+
+# 接收缓冲区池，多个传输之间复用CHUNK_SIZE大小的缓冲区，避免每次传输重新分配
+_recv_buffer_pool = queue.LifoQueue(maxsize=4 * RECV_BUFFERS_PER_TRANSFER)
+
+def _acquire_recv_buffer():
+    """从缓冲区池中取出一个接收缓冲区，池为空时新建"""
+    try:
+        return _recv_buffer_pool.get_nowait()
+    except queue.Empty:
+        return bytearray(CHUNK_SIZE)
+
+def _release_recv_buffer(buffer):
+    """归还接收缓冲区，池已满时直接丢弃"""
+    try:
+        _recv_buffer_pool.put_nowait(buffer)
+    except queue.Full:
+        pass
 
 class FileTransferServer(QObject):
     """文件传输服务器，用于接收客户端发送的文件"""
@@ -44,12 +76,27 @@ class FileTransferServer(QObject):
         self.host = host
         self.port = port
         self.server_socket = None
+        self._wakeup_writer = None  # 用于唤醒服务器循环的套接字
         self.running = False
         self.transfer_thread = None
         self.save_dir = os.path.expanduser("~/Downloads/SendNow")
         
-        # 待处理的传输请求
-        self.pending_requests = {}
+        # 待处理的传输请求（以客户端套接字为键，按到达顺序排列，超出上限时淘汰最早的请求）
+        self.pending_requests = OrderedDict()
+        self._pending_lock = threading.Lock()
+        
+        # 已接受但尚未关闭的客户端连接，停止服务器时用于中断仍在进行的I/O
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+        
+        # 处理传输请求的线程池，在start()中创建，stop()时关闭
+        self._request_pool = None
+        
+        # 接收文件数据的线程池，在start()中创建，stop()时关闭
+        self._transfer_pool = None
+        
+        # 接受/拒绝操作队列，由单个工作线程（在start()中启动，stop()时结束）按顺序执行，避免在UI线程中进行套接字I/O
+        self._control_queue = queue.Queue()
         
         # 确保保存目录存在
         ensure_directory_exists(self.save_dir)
@@ -63,21 +110,39 @@ class FileTransferServer(QObject):
             # 创建服务器套接字
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            configure_socket(self.server_socket)  # 接受的连接继承监听套接字的缓冲区大小
             self.server_socket.bind((self.host, self.port))
             self.server_socket.listen(5)
+            self.server_socket.setblocking(False)
+            
+            # 创建唤醒套接字对，停止时向其写入数据以立即唤醒服务器循环
+            wakeup_reader, self._wakeup_writer = socket.socketpair()
+            
+            # 处理传输请求的线程池，复用线程而不是为每个连接创建新线程
+            self._request_pool = ThreadPoolExecutor(max_workers=MAX_REQUEST_HANDLERS, thread_name_prefix="SendNowRequest")
+            
+            # 接收文件数据的线程池，限制同时进行的接收传输数量
+            self._transfer_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_TRANSFERS, thread_name_prefix="SendNowTransfer")
+            
+            # 启动控制操作工作线程
+            threading.Thread(target=self._control_worker, daemon=True).start()
             
             # 设置运行标志
             self.running = True
             
             # 启动服务器线程
-            self.transfer_thread = threading.Thread(target=self._server_loop, daemon=True)
+            self.transfer_thread = threading.Thread(
+                target=self._server_loop,
+                args=(self.server_socket, wakeup_reader),
+                daemon=True
+            )
             self.transfer_thread.start()
             
-            logger.info(f"文件传输服务器已启动 ({self.host}:{self.port})")
+            logger.info("文件传输服务器已启动 (%s:%s)", self.host, self.port)
             self.statusChanged.emit("服务器已启动")
         
         except Exception as e:
-            logger.error(f"启动文件传输服务器失败: {str(e)}")
+            logger.error("启动文件传输服务器失败: %s", e)
             self.statusChanged.emit(f"启动失败: {str(e)}")
     
     def stop(self):
@@ -89,22 +154,38 @@ class FileTransferServer(QObject):
         self.running = False
         self.statusChanged.emit("服务器正在停止...")
         
-        # 在后台线程中关闭套接字和清理
-        def close_socket():
-            try:
-                # 关闭服务器套接字
-                if self.server_socket:
-                    self.server_socket.close()
-                
-                logger.info("文件传输服务器已停止")
-                self.statusChanged.emit("服务器已停止")
-            
-            except Exception as e:
-                logger.error(f"停止文件传输服务器失败: {str(e)}")
-                self.statusChanged.emit(f"停止失败: {str(e)}")
+        # 唤醒服务器循环，由服务器线程负责关闭套接字和清理
+        try:
+            self._wakeup_writer.send(b'\0')
+            self._wakeup_writer.close()
+        except Exception as e:
+            logger.error("停止文件传输服务器失败: %s", e)
+            self.statusChanged.emit(f"停止失败: {str(e)}")
+        
+        # 关闭线程池（不等待），线程池的工作线程不是守护线程，进程退出时会等待它们结束
+        self._request_pool.shutdown(wait=False)
+        self._transfer_pool.shutdown(wait=False)
+        
+        # 通知控制操作工作线程在处理完已入队的操作后退出
+        self._control_queue.put(None)
         
-        # 启动后台线程进行关闭操作
-        threading.Thread(target=close_socket, daemon=True).start()
+        # 中断所有客户端连接，使阻塞在recv/send中的工作线程立即返回，而不是等到超时
+        with self._connections_lock:
+            connections = list(self._connections)
+        for client_socket in connections:
+            try:
+                client_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+    
+    def _close_connection(self, client_socket):
+        """关闭客户端连接并停止跟踪"""
+        with self._connections_lock:
+            self._connections.discard(client_socket)
+        try:
+            client_socket.close()
+        except OSError:
+            pass
     
     def set_save_directory(self, directory):
         """设置文件保存目录"""
@@ -118,172 +199,393 @@ class FileTransferServer(QObject):
             
             # 设置保存目录
             self.save_dir = directory
-            logger.info(f"文件保存目录已设置为: {directory}")
+            logger.info("文件保存目录已设置为: %s", directory)
             return True
         
         except Exception as e:
-            logger.error(f"设置保存目录失败: {str(e)}")
+            logger.error("设置保存目录失败: %s", e)
             return False
     
-    def _server_loop(self):
+    def _server_loop(self, server_socket, wakeup_reader):
         """服务器主循环，接受客户端连接并处理文件传输"""
-        while self.running:
-            try:
-                # 接受客户端连接
-                client_socket, client_address = self.server_socket.accept()
-                
-                # 处理传输请求
-                threading.Thread(
-                    target=self._handle_transfer_request,
-                    args=(client_socket, client_address),
-                    daemon=True
-                ).start()
-                
-            except Exception as e:
-                if self.running:  # 只在服务器正常运行时记录错误
-                    logger.error(f"接受客户端连接失败: {str(e)}")
-                    self.statusChanged.emit(f"连接失败: {str(e)}")
-                time.sleep(0.1)  # 避免CPU占用过高
+        # 使用系统最优的I/O多路复用机制（Linux上为epoll，macOS上为kqueue）等待连接或停止信号
+        selector = selectors.DefaultSelector()
+        selector.register(server_socket, selectors.EVENT_READ)
+        selector.register(wakeup_reader, selectors.EVENT_READ)
+        
+        try:
+            while self.running:
+                for key, _ in selector.select():
+                    if key.fileobj is wakeup_reader:
+                        continue  # 停止信号，回到循环条件检查
+                    
+                    try:
+                        # 接受客户端连接
+                        client_socket, client_address = server_socket.accept()
+                    except BlockingIOError:
+                        continue  # 连接在accept前已被对方重置
+                    except Exception as e:
+                        if self.running:  # 只在服务器正常运行时记录错误
+                            logger.error("接受客户端连接失败: %s", e)
+                            self.statusChanged.emit(f"连接失败: {str(e)}")
+                        continue
+                    
+                    # 与客户端一致使用60秒超时，对端失去响应时释放线程池中的工作线程
+                    client_socket.settimeout(60)
+                    configure_socket(client_socket)
+                    with self._connections_lock:
+                        self._connections.add(client_socket)
+                    
+                    # 处理传输请求
+                    try:
+                        self._request_pool.submit(self._handle_transfer_request, client_socket, client_address)
+                    except RuntimeError:
+                        self._close_connection(client_socket)  # 线程池已在停止时关闭
+        
+        finally:
+            # 关闭服务器套接字和唤醒套接字
+            selector.close()
+            server_socket.close()
+            wakeup_reader.close()
+            
+            logger.info("文件传输服务器已停止")
+            self.statusChanged.emit("服务器已停止")
     
     def _handle_transfer_request(self, client_socket, client_address):
         """处理客户端的传输请求"""
         try:
             # 接收文件信息
-            info_data = client_socket.recv(4096)
-            if not info_data:
-                client_socket.close()
+            file_info = recv_message(client_socket)
+            if file_info is None:
+                self._close_connection(client_socket)
                 return
             
-            # 解析文件信息
-            file_info = json.loads(info_data.decode('utf-8'))
+            # 添加发送者信息
             file_info['sender'] = client_address[0]  # 添加发送者IP
             
-            logger.info(f"收到文件传输请求: {file_info['name']} ({file_info['size']} 字节) 来自 {client_address[0]}")
+            logger.info("收到文件传输请求: %s (%s 字节) 来自 %s", file_info['name'], file_info['size'], client_address[0])
             
             # 发送待确认的传输请求信号，等待用户确认
-            request_id = str(time.time())
-            self.pending_requests[request_id] = {
-                'file_info': file_info,
-                'client_socket': client_socket,
-                'client_address': client_address
-            }
+            with self._pending_lock:
+                self.pending_requests[client_socket] = {
+                    'file_info': file_info,
+                    'client_socket': client_socket,
+                    'client_address': client_address
+                }
+                
+                # 长时间未处理的请求过多时，关闭最早的请求，避免占用的套接字和内存无限增长
+                evicted = []
+                while len(self.pending_requests) > MAX_PENDING_REQUESTS:
+                    evicted.append(self.pending_requests.popitem(last=False)[0])
+            
+            for old_socket in evicted:
+                logger.warning("待确认的传输请求过多，已关闭最早的请求")
+                self._close_connection(old_socket)
             
             # 向UI发送信号，等待用户确认
             self.pendingTransferRequest.emit(file_info, client_socket)
             
         except Exception as e:
-            logger.error(f"处理传输请求失败: {str(e)}")
+            logger.error("处理传输请求失败: %s", e)
+            self._close_connection(client_socket)
+    
+    def _control_worker(self):
+        """控制操作工作线程，按入队顺序执行接受/拒绝操作"""
+        while True:
+            item = self._control_queue.get()
+            if item is None:
+                break  # 服务器已停止
+            func, args = item
             try:
-                client_socket.close()
-            except:
-                pass
+                func(*args)
+            except Exception as e:
+                logger.error("执行传输控制操作失败: %s", e)
     
     def accept_transfer(self, client_socket, client_address, file_info, custom_save_dir=None):
+        """接受文件传输请求（异步执行，立即返回）"""
+        self._control_queue.put((self._do_accept_transfer, (client_socket, client_address, file_info, custom_save_dir)))
+    
+    def reject_transfer(self, client_socket):
+        """拒绝文件传输请求（异步执行，立即返回）"""
+        self._control_queue.put((self._do_reject_transfer, (client_socket,)))
+    
+    def _do_accept_transfer(self, client_socket, client_address, file_info, custom_save_dir=None):
         """接受文件传输请求"""
-        # 向客户端发送接受响应
+        # 优先使用收到请求时保存的记录，无需重新构建文件信息
+        with self._pending_lock:
+            pending = self.pending_requests.pop(client_socket, None)
+        if pending:
+            file_info = pending['file_info']
+            client_address = pending['client_address']
+        
         try:
-            response = {"status": "accepted"}
-            client_socket.sendall(json.dumps(response).encode('utf-8'))
-            
-            # 启动文件接收线程
+            # 提交到接收线程池，接受响应由工作线程开始处理时发送。超出并发上限的发送方
+            # 在有空闲线程之前一直等待响应（客户端等待接受响应时不设超时），不会提前开始发送数据
             save_dir = custom_save_dir if custom_save_dir else self.save_dir
-            threading.Thread(
-                target=self._handle_client,
-                args=(client_socket, client_address, file_info, save_dir),
-                daemon=True
-            ).start()
+            self._transfer_pool.submit(self._handle_client, client_socket, client_address, file_info, save_dir)
             
-            logger.info(f"已接受文件传输请求: {file_info['name']}")
+            logger.info("已接受文件传输请求: %s", file_info['name'])
             
         except Exception as e:
-            logger.error(f"接受传输请求失败: {str(e)}")
-            try:
-                client_socket.close()
-            except:
-                pass
+            logger.error("接受传输请求失败: %s", e)
+            self._close_connection(client_socket)
     
-    def reject_transfer(self, client_socket):
+    def _do_reject_transfer(self, client_socket):
         """拒绝文件传输请求"""
+        with self._pending_lock:
+            self.pending_requests.pop(client_socket, None)
+        
         try:
             # 向客户端发送拒绝响应
-            response = {"status": "rejected", "reason": "User rejected the transfer"}
-            client_socket.sendall(json.dumps(response).encode('utf-8'))
-            client_socket.close()
+            client_socket.sendall(_REJECTED_RESPONSE)
+            self._close_connection(client_socket)
             
             logger.info("已拒绝文件传输请求")
             
         except Exception as e:
-            logger.error(f"拒绝传输请求失败: {str(e)}")
+            logger.error("拒绝传输请求失败: %s", e)
+            self._close_connection(client_socket)
+    
+    def _create_temp_file(self, save_dir, filename):
+        """以O_EXCL方式创建接收用的临时文件（文件名加.part），文件已存在时添加数字后缀，
+        返回(临时文件路径, 文件描述符)
+        
+        创建与检查在同一次系统调用中原子完成，同时接收多个同名文件时不会互相覆盖，
+        也不会覆盖用户已有的同名.part文件。
+        """
+        base_name, ext = os.path.splitext(filename)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+        counter = 0
+        directory_created = False
+        while True:
+            name = filename if counter == 0 else f"{base_name}_{counter}{ext}"
+            temp_path = os.path.join(save_dir, name + ".part")
             try:
-                client_socket.close()
-            except:
-                pass
+                return temp_path, os.open(temp_path, flags, 0o644)
+            except FileExistsError:
+                counter += 1
+            except FileNotFoundError:
+                # 保存目录在设置时已创建，只有被删除后才需要重新创建（只重试一次），避免每次传输都检查目录
+                if directory_created:
+                    raise
+                ensure_directory_exists(save_dir)
+                directory_created = True
+    
+    def _publish_file(self, temp_path, save_dir, filename):
+        """将校验通过的临时文件发布为最终文件，同名文件已存在时添加数字后缀，返回保存路径
+        
+        通过硬链接发布：目标已存在时os.link直接失败而不会覆盖，检查与创建同样原子完成。
+        """
+        base_name, ext = os.path.splitext(filename)
+        counter = 0
+        while True:
+            name = filename if counter == 0 else f"{base_name}_{counter}{ext}"
+            save_path = os.path.join(save_dir, name)
+            try:
+                os.link(temp_path, save_path)
+            except FileExistsError:
+                counter += 1
+                continue
+            except OSError:
+                # 文件系统不支持硬链接（如FAT32、exFAT）时，先以O_EXCL占用最终文件名再替换
+                flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+                try:
+                    os.close(os.open(save_path, flags, 0o644))
+                except FileExistsError:
+                    counter += 1
+                    continue
+                try:
+                    os.replace(temp_path, save_path)
+                except OSError:
+                    os.remove(save_path)
+                    raise
+                return save_path
+            
+            os.remove(temp_path)
+            return save_path
     
     def _handle_client(self, client_socket, client_address, file_info, save_dir):
         """处理客户端连接，接收文件数据"""
         filename = file_info['name']
         file_size = file_info['size']
-        file_hash = file_info.get('hash', '')  # 可选的文件哈希值
         
-        # 确保保存目录存在
-        ensure_directory_exists(save_dir)
-        
-        # 构建保存路径
-        save_path = os.path.join(save_dir, filename)
-        
-        # 如果文件已存在，添加数字后缀
-        base_name, ext = os.path.splitext(filename)
-        counter = 1
-        while os.path.exists(save_path):
-            new_name = f"{base_name}_{counter}{ext}"
-            save_path = os.path.join(save_dir, new_name)
-            counter += 1
+        temp_path = None
+        finalized = False
         
         try:
+            # 从客户端支持的算法中选择双方都支持的第一个，没有共同支持的算法时使用默认算法
+            # （在try中进行，对端发送的列表格式异常时按传输失败处理并关闭连接）
+            hash_algorithm = next(
+                (algorithm for algorithm in file_info.get('hash_algorithms', ())
+                 if algorithm in SUPPORTED_HASH_ALGORITHMS),
+                HASH_ALGORITHM
+            )
+            file_info['hash_algorithm'] = hash_algorithm
+            
+            # 向客户端发送接受响应，客户端收到后才开始发送文件数据
+            client_socket.sendall(_ACCEPTED_RESPONSES[hash_algorithm])
+            
             # 发出传输请求信号
             self.transferRequest.emit(file_info)
             
-            # 接收文件数据
-            with open(save_path, 'wb') as f:
+            # 先接收到临时文件中，校验通过后才以最终文件名发布，接收过程中或程序异常退出时
+            # 不会留下使用最终文件名的不完整文件。只使用文件名部分，忽略对端发送的目录
+            name = os.path.basename(filename)
+            temp_path, fd = self._create_temp_file(save_dir, name)
+            
+            # 接收文件数据（使用底层文件描述符直接写入，跳过Python的缓冲层）
+            buffers = []
+            try:
+                # 预先分配磁盘空间，减少文件碎片和写入过程中的元数据更新
+                if file_size > 0 and hasattr(os, 'posix_fallocate'):
+                    try:
+                        os.posix_fallocate(fd, 0, file_size)
+                    except OSError:
+                        pass  # 文件系统不支持时直接写入即可
+                
                 received = 0
-                hash_obj = hashlib.md5()
+                hash_obj = new_hasher(hash_algorithm)
+                next_progress_time = 0.0
+                reported = -1  # 最近一次发出的进度，避免循环结束后重复发送相同进度
+                # 累计一定字节数（文件大小的0.5%，最多一个数据块）后才检查时间，避免每个零碎的数据块都读取时钟
+                progress_step = min(file_size // 200, CHUNK_SIZE)
                 
-                while received < file_size:
-                    # 计算剩余字节数
-                    remaining = file_size - received
-                    chunk_size = min(BUFFER_SIZE, remaining)
-                    
-                    # 接收数据块
-                    chunk = client_socket.recv(chunk_size)
-                    if not chunk:
-                        raise Exception("连接中断")
-                    
-                    # 写入文件
-                    f.write(chunk)
-                    hash_obj.update(chunk)
-                    
-                    # 更新接收计数
-                    received += len(chunk)
-                    
-                    # 发送进度信号
-                    self.transferProgress.emit(filename, received, file_size)
+                # 接收与写盘并行进行：当前线程接收数据并计算哈希，写入线程负责写盘，
+                # 多个接收缓冲区轮流使用，空闲缓冲区用完时接收端等待写入线程（背压）
+                buffers = [_acquire_recv_buffer() for _ in range(RECV_BUFFERS_PER_TRANSFER)]
+                free_buffers = queue.Queue()
+                for buffer in buffers:
+                    free_buffers.put(buffer)
+                filled_buffers = queue.Queue()
+                write_errors = []
+                
+                def write_worker():
+                    unsynced = 0
+                    while True:
+                        item = filled_buffers.get()
+                        if item is None:
+                            break
+                        buffer, n = item
+                        if not write_errors:
+                            try:
+                                write_all(fd, memoryview(buffer)[:n])
+                                
+                                # 定期同步已写入的数据，限制未落盘的数据量，避免最终同步耗时过长
+                                unsynced += n
+                                if unsynced >= SYNC_INTERVAL:
+                                    _fdatasync(fd)
+                                    unsynced = 0
+                            except Exception as e:
+                                write_errors.append(e)
+                        free_buffers.put(buffer)
+                
+                writer = threading.Thread(target=write_worker, daemon=True)
+                writer.start()
+                
+                # 循环中频繁调用的方法预先绑定到局部变量，减少每次迭代的属性查找
+                recv_into = client_socket.recv_into
+                update_hash = hash_obj.update
+                get_free_buffer = free_buffers.get
+                put_filled_buffer = filled_buffers.put
+                emit_progress = self.transferProgress.emit
+                monotonic = time.monotonic
+                
+                try:
+                    while received < file_size:
+                        # 写入线程出错时立即终止接收
+                        if write_errors:
+                            raise write_errors[0]
+                        
+                        # 本次要填满的字节数（最后一块为剩余字节数）
+                        size = min(CHUNK_SIZE, file_size - received)
+                        
+                        # 将空闲缓冲区接收满后再交给写入线程，每次写盘都是完整的数据块
+                        buffer = get_free_buffer()
+                        view = memoryview(buffer)
+                        filled = 0
+                        while filled < size:
+                            # 接收数据（数据直接从内核拷贝到缓冲区中）
+                            n = recv_into(view[filled:size])
+                            if not n:
+                                raise Exception("连接中断")
+                            filled += n
+                            
+                            # 发送进度信号（限制频率，避免每次接收都触发UI更新）
+                            current = received + filled
+                            if current - reported >= progress_step:
+                                now = monotonic()
+                                if now >= next_progress_time:
+                                    emit_progress(filename, current, file_size)
+                                    reported = current
+                                    next_progress_time = now + PROGRESS_INTERVAL
+                        
+                        # 计算哈希后交给写入线程写盘
+                        update_hash(view[:size])
+                        put_filled_buffer((buffer, size))
+                        
+                        # 更新接收计数
+                        received += size
+                finally:
+                    # 通知写入线程结束，并等待已接收的数据全部写完
+                    filled_buffers.put(None)
+                    writer.join()
+                
+                if write_errors:
+                    raise write_errors[0]
+                
+                # 数据全部落盘后再进行校验和重命名，避免断电等情况下留下内容不完整的文件
+                # （fdatasync只同步数据和文件大小，跳过时间戳等元数据，没有该函数的平台使用fsync；
+                # 写入线程已定期同步，这里只需同步最后不足SYNC_INTERVAL的数据）
+                _fdatasync(fd)
+                
+                # 数据已写入磁盘，通知内核释放其页缓存，避免大文件挤占其他程序的缓存
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+                for buffer in buffers:
+                    _release_recv_buffer(buffer)
+            
+            # 发送最终进度（循环中最后一次已发送时跳过）
+            if reported != received:
+                self.transferProgress.emit(filename, received, file_size)
+            
+            # 接收客户端在数据之后发送的文件哈希值
+            trailer = recv_message(client_socket)
+            if trailer is None:
+                raise Exception("连接中断")
+            file_hash = trailer.get('hash', '')
             
             # 验证文件哈希值
             received_hash = hash_obj.hexdigest()
             if file_hash and received_hash != file_hash:
                 raise Exception(f"文件哈希值不匹配: 预期 {file_hash}，实际 {received_hash}")
             
+            # 校验通过，以最终文件名发布（同名文件已存在时添加数字后缀）
+            save_path = self._publish_file(temp_path, save_dir, name)
+            finalized = True
+            
+            # 同步所在目录，确保发布本身在断电后也能保留（Windows不支持打开目录，失败时忽略）
+            if os.name == 'posix':
+                try:
+                    dir_fd = os.open(os.path.dirname(save_path) or '.', os.O_RDONLY)
+                    try:
+                        os.fsync(dir_fd)
+                    finally:
+                        os.close(dir_fd)
+                except OSError:
+                    pass
+            
             # 发送传输完成信号
-            logger.info(f"文件接收完成: {filename} -> {save_path}")
+            logger.info("文件接收完成: %s -> %s", filename, save_path)
             self.transferComplete.emit(filename, save_path)
             
             # 向客户端发送成功响应
-            response = {"status": "success", "message": "File received successfully"}
-            client_socket.sendall(json.dumps(response).encode('utf-8'))
+            client_socket.sendall(_SUCCESS_RESPONSE)
         
         except Exception as e:
             error_msg = str(e)
-            logger.error(f"文件接收失败: {filename} - {error_msg}")
+            logger.error("文件接收失败: %s - %s", filename, error_msg)
             
             # 发送传输失败信号
             self.transferFailed.emit(filename, error_msg)
@@ -291,20 +593,17 @@ class FileTransferServer(QObject):
             # 向客户端发送失败响应
             try:
                 response = {"status": "error", "message": error_msg}
-                client_socket.sendall(json.dumps(response).encode('utf-8'))
+                send_message(client_socket, response)
             except:
                 pass
             
-            # 删除不完整的文件
-            try:
-                if os.path.exists(save_path):
-                    os.remove(save_path)
-            except:
-                pass
+            # 删除不完整的临时文件
+            if not finalized and temp_path is not None:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
         
         finally:
             # 关闭客户端连接
-            try:
-                client_socket.close()
-            except:
-                pass 
\ No newline at end of file
+            self._close_connection(client_socket) 
\ No newline at end of file
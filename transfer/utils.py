@@ -7,7 +7,8 @@
 
 该模块提供文件传输过程中需要的各种辅助函数和工具。
 主要功能：
-- 文件哈希计算（MD5）用于文件完整性校验
+- 创建文件完整性校验使用的哈希对象（SHA-256，可选BLAKE3）
+- 控制消息收发（4字节长度前缀 + JSON）
 - 文件大小格式化显示（B/KB/MB）
 - 目录操作辅助（创建目录、检查可写性）
 
@@ -15,15 +16,95 @@
 """
 
 import os
+import json
+import socket
+import struct
 import hashlib
 
-def compute_file_hash(file_path):
-    """计算文件的MD5哈希值"""
-    hash_obj = hashlib.md5()
-    with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(8192), b''):
-            hash_obj.update(chunk)
-    return hash_obj.hexdigest()
+from .common import SOCKET_BUFFER_SIZE, HASH_ALGORITHM, MAX_MESSAGE_SIZE
+
+# blake3为可选依赖（SIMD加速），未安装时仅支持hashlib中的算法
+try:
+    from blake3 import blake3 as _blake3
+except ImportError:
+    _blake3 = None
+
+# orjson为可选依赖（更快的JSON编解码），未安装时使用标准库json
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+    
+    def _json_loads(data):
+        return json.loads(data.decode('utf-8'))
+
+# 本机支持的文件校验算法，按优先级排列（BLAKE3速度最快，安装blake3后优先使用）
+SUPPORTED_HASH_ALGORITHMS = ("blake3", HASH_ALGORITHM) if _blake3 is not None else (HASH_ALGORITHM,)
+
+# 控制消息的长度前缀格式（4字节大端无符号整数），预编译避免每次重新解析格式字符串
+_LENGTH_PREFIX = struct.Struct('!I')
+
+def new_hasher(algorithm=HASH_ALGORITHM):
+    """创建指定算法的哈希对象"""
+    if algorithm == "blake3":
+        if _blake3 is None:
+            raise ValueError("不支持的哈希算法: blake3（未安装blake3库）")
+        return _blake3()
+    return hashlib.new(algorithm)
+
+def configure_socket(sock):
+    """配置传输套接字参数"""
+    # 禁用Nagle算法，避免批量数据之后的小控制消息被延迟发送
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    
+    # 增大收发缓冲区，减少大文件传输时的系统调用次数
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+
+def recv_all(sock, size):
+    """从套接字接收恰好size字节的数据，连接关闭时返回None"""
+    # 预先分配缓冲区并直接接收到其中，避免逐包拼接造成的重复拷贝
+    data = bytearray(size)
+    view = memoryview(data)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if not n:
+            return None
+        received += n
+    return data
+
+def encode_message(message):
+    """将控制消息编码为带4字节大端长度前缀的字节串，固定内容的消息可预先编码后复用"""
+    data = _json_dumps(message)
+    return _LENGTH_PREFIX.pack(len(data)) + data
+
+def send_message(sock, message):
+    """发送控制消息：4字节大端长度前缀 + UTF-8编码的JSON"""
+    sock.sendall(encode_message(message))
+
+def recv_message(sock):
+    """接收一条控制消息并解析JSON，连接关闭时返回None"""
+    header = recv_all(sock, _LENGTH_PREFIX.size)
+    if header is None:
+        return None
+    (length,) = _LENGTH_PREFIX.unpack(header)
+    if length > MAX_MESSAGE_SIZE:
+        raise ValueError(f"控制消息过大: {length} 字节")
+    data = recv_all(sock, length)
+    if data is None:
+        return None
+    return _json_loads(data)
+
+def write_all(fd, data):
+    """将数据完整写入文件描述符（处理os.write部分写入的情况）"""
+    view = memoryview(data)
+    while view:
+        n = os.write(fd, view)
+        view = view[n:]
 
 def format_file_size(size_bytes):
     """格式化文件大小显示"""